@@ -1,13 +1,21 @@
 from datetime import datetime
 from flask import Flask, Blueprint
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_restx import Api
 from flask_jwt_extended import JWTManager
-from .config import Config
+from .config import Config, TestingConfig
 import os
 import logging
 
+# orjson — опциональное ускорение JSON: сериализация на C заметно быстрее
+# stdlib json на больших ответах аналитики
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 # Настройка базового логирования
 logging.basicConfig(
@@ -20,6 +28,16 @@ logger = logging.getLogger('app')
 db = SQLAlchemy()
 jwt = JWTManager()
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON-провайдер Flask поверх orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Создаем экземпляр API с настройками авторизации
 authorizations = {
     'Bearer Auth': {
@@ -43,11 +61,20 @@ api = Api(api_bp,
     security='Bearer Auth'
 )
 
-def create_app(import_data=True):
+def create_app(config_name=None, import_data=True):
     app = Flask(__name__, instance_relative_config=True)
-    
-    # Загрузка конфигурации
-    app.config.from_object(Config)
+
+    # При наличии orjson подменяем стандартный JSON-провайдер
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+
+    # Загрузка конфигурации: 'testing' работает на SQLite в памяти
+    # и никогда не запускает импорт данных
+    if config_name == 'testing':
+        app.config.from_object(TestingConfig)
+        import_data = False
+    else:
+        app.config.from_object(Config)
     
     # Получаем настройки CORS из конфигурации или .env
     cors_origins = app.config.get('CORS_ORIGINS', '*')
@@ -129,12 +156,14 @@ def create_app(import_data=True):
                     products_count = db.session.query(db.func.count(Product.id)).scalar()
                     stores_count = db.session.query(db.func.count(Store.id)).scalar()
                     sales_count = db.session.query(db.func.count(Sale.id)).scalar()
-                    sales = db.session.query(Sale).limit(5).all()
+                    # Один JOIN вместо двух .get() на каждую продажу
+                    sales = (db.session.query(Sale, Product.name, Store.name)
+                             .join(Product, Sale.product_id == Product.id)
+                             .join(Store, Sale.store_id == Store.id)
+                             .limit(5).all())
                     print(f"\n===== ПЕРВЫЕ 5 ПРОДАЖ =====")
-                    for sale in sales:
-                        product = db.session.query(Product).get(sale.product_id)
-                        store = db.session.query(Store).get(sale.store_id)
-                        print(f"ID: {sale.id}, Дата: {sale.date}, Товар: {product.name}, Магазин: {store.name}, Количество: {sale.quantity}, Цена: {sale.price}")
+                    for sale, product_name, store_name in sales:
+                        print(f"ID: {sale.id}, Дата: {sale.date}, Товар: {product_name}, Магазин: {store_name}, Количество: {sale.quantity}, Цена: {sale.price}")
                     
                     # Проверяем наличие товаров с нулевыми ценами
                     zero_price_count = db.session.query(db.func.count(Product.id)).filter(Product.price == 0).scalar()
@@ -1,6 +1,7 @@
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
+from sqlalchemy.pool import StaticPool
 
 load_dotenv()
 
@@ -8,6 +9,17 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY') or '6257'
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Многострочные INSERT (insertmanyvalues) страницами по 10000 строк
+    SQLALCHEMY_ENGINE_OPTIONS = {'insertmanyvalues_page_size': 10000}
+
+    # Пакетный режим executemany для psycopg2: страницы VALUES по 10000
+    # строк вместо отдельного INSERT на каждую строку пакета
+    if (SQLALCHEMY_DATABASE_URI or '').startswith('postgresql'):
+        SQLALCHEMY_ENGINE_OPTIONS.update({
+            'executemany_mode': 'values_plus_batch',
+            'executemany_values_page_size': 10000,
+        })
     
     # Настройки CORS
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', '*')
@@ -19,4 +31,63 @@ class Config:
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
     JWT_TOKEN_LOCATION = ['headers']
     JWT_HEADER_NAME = 'Authorization'
-    JWT_HEADER_TYPE = ''
\ No newline at end of file
+    JWT_HEADER_TYPE = ''
+
+    # Метод хеширования паролей для werkzeug.generate_password_hash
+    PASSWORD_HASH_METHOD = 'pbkdf2'
+
+
+class TestingConfig(Config):
+    """Конфигурация для тестов: SQLite в памяти вместо внешней БД"""
+    TESTING = True
+
+    # Ошибки в обработчиках должны долетать до теста как исключения,
+    # а не превращаться в HTML-страницу отладчика werkzeug
+    DEBUG = False
+    PROPAGATE_EXCEPTIONS = True
+    TRAP_HTTP_EXCEPTIONS = False
+
+    # Закрепляем явно: трекер модификаций навешивает слушатели на каждую
+    # сессию, а echo пишет весь SQL в лог — в тестах и то и другое лишнее,
+    # даже если базовый конфиг когда-нибудь их включит
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ECHO = False
+
+    # При запуске под pytest-xdist каждый воркер получает свою именованную
+    # базу в памяти; без xdist переменная не задана и имя остается 'master'
+    _worker = os.getenv('PYTEST_XDIST_WORKER', 'master')
+    SQLALCHEMY_DATABASE_URI = (
+        f'sqlite:///file:airba_test_{_worker}?mode=memory&cache=shared&uri=true'
+    )
+
+    # В CI тесты могут идти на внешнем Postgres: база воркера клонируется
+    # из шаблонной через CREATE DATABASE ... TEMPLATE (см. tests/conftest.py)
+    _external = os.getenv('TEST_DATABASE_URL')
+    if _external:
+        SQLALCHEMY_DATABASE_URI = _external
+
+    # Одна итерация PBKDF2 вместо сотен тысяч: в тестах важна логика,
+    # а не стойкость ключа
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1'
+
+    # StaticPool держит единственное соединение на весь процесс — иначе
+    # каждое новое соединение получало бы свою пустую базу в памяти.
+    # isolation_level=None отключает управление транзакциями в pysqlite:
+    # без этого драйвер сам делает COMMIT и ломает SAVEPOINT-изоляцию тестов
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'insertmanyvalues_page_size': 10000,
+        # Запас по размеру кеша скомпилированных запросов, чтобы горячие
+        # запросы тестов не вытесняли друг друга (по умолчанию 500)
+        'query_cache_size': 1200,
+        'poolclass': StaticPool,
+        # Единственному соединению в памяти ping перед checkout не нужен
+        'pool_pre_ping': False,
+        'connect_args': {'check_same_thread': False, 'isolation_level': None},
+    }
+
+    # SQLite-специфичные опции движка не подходят внешней базе
+    if _external:
+        SQLALCHEMY_ENGINE_OPTIONS = {
+            'insertmanyvalues_page_size': 10000,
+            'query_cache_size': 1200,
+        }
\ No newline at end of file
@@ -5,7 +5,7 @@ class City(db.Model):
     __tablename__ = 'cities'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, unique=True, index=True)
     region = db.Column(db.String(100), nullable=True)
     population = db.Column(db.Integer, nullable=True)
     
@@ -19,7 +19,7 @@ class Store(db.Model):
     __tablename__ = 'stores'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, unique=True, index=True)
     address = db.Column(db.String(200), nullable=True)
     city_id = db.Column(db.Integer, db.ForeignKey('cities.id'), nullable=False)
     size = db.Column(db.Float, nullable=True)  # Размер магазина в кв. метрах
@@ -35,9 +35,9 @@ class CategoryGroup(db.Model):
     __tablename__ = 'category_groups'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, unique=True, index=True)
     description = db.Column(db.Text, nullable=True)
-    
+
     # Связь с категориями
     categories = db.relationship('Category', backref='group', lazy=True)
 
@@ -46,7 +46,10 @@ class CategoryGroup(db.Model):
 
 class Category(db.Model):
     __tablename__ = 'categories'
-    
+
+    # Уникальность имени категории в пределах группы — для идемпотентного импорта
+    __table_args__ = (db.UniqueConstraint('group_id', 'name', name='uq_category_group_name'),)
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -62,7 +65,7 @@ class Product(db.Model):
     __tablename__ = 'products'
     
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(200), nullable=False)
+    name = db.Column(db.String(200), nullable=False, unique=True, index=True)
     description = db.Column(db.Text, nullable=True)
     price = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, default=0)
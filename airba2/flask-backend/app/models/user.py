@@ -1,11 +1,44 @@
+from flask import g
+from sqlalchemy import select, bindparam
+
 from .. import db
 
 class User(db.Model):
     __tablename__ = 'users'
 
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
+    username = db.Column(db.String(80), nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
 
+    # Именованный уникальный индекс вместо анонимного unique=True:
+    # поиск по имени — основной путь чтения, и имя индекса можно
+    # проверять в тестах (см. tests/conftest.py)
+    __table_args__ = (
+        db.Index('ix_users_username', 'username', unique=True),
+    )
+
+    @classmethod
+    def get_by_username(cls, username):
+        """Поиск пользователя по имени с мемоизацией на время запроса.
+
+        Кеш живет в flask.g, то есть сбрасывается с каждым запросом:
+        повторные обращения внутри одного запроса (например, middleware
+        и обработчик) дают один SQL вместо двух, а проблем инвалидации
+        глобального кеша не возникает.
+        """
+        cache = getattr(g, '_user_cache', None)
+        if cache is None:
+            cache = g._user_cache = {}
+        if username not in cache:
+            cache[username] = db.session.execute(
+                _USER_BY_USERNAME, {'username': username}).scalar_one_or_none()
+        return cache[username]
+
     def __repr__(self):
-        return f'<User {self.username}>'
\ No newline at end of file
+        return f'<User {self.username}>'
+
+
+# Запрос собирается один раз при импорте; в get_by_username остается
+# только подстановка параметра
+_USER_BY_USERNAME = select(User).where(
+    User.username == bindparam('username')).limit(1)
\ No newline at end of file
@@ -24,10 +24,12 @@ def register_routes(api):
     """
     # Импорт здесь для избежания циклических зависимостей
     from .auth import register_auth_routes  # Используем существующий auth.py вместо user_routes
+    from .api import user_ns
     from .analytics import setup_analytics_routes
-    
+
     # Регистрация маршрутов
     register_auth_routes(api)  # Предполагаем, что auth.py содержит функцию register_auth_routes
+    api.add_namespace(user_ns)
     
     # Регистрация аналитического модуля со всеми подмодулями
     setup_analytics_routes(api)
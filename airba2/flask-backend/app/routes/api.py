@@ -1,5 +1,6 @@
 from flask_restx import Namespace, Resource, fields
-from flask import request
+from flask import request, current_app
+from werkzeug.security import generate_password_hash
 from .. import api, db
 from ..models.user import User
 from functools import wraps
@@ -23,7 +24,7 @@ def register_namespaces():
     api.add_namespace(user_ns)
     api.add_namespace(auth_ns)
 
-@user_ns.route('/')
+@user_ns.route('', '/')
 class UserList(Resource):
     @user_ns.doc('list_users')
     @jwt_required()
@@ -42,8 +43,31 @@ class UserList(Resource):
     @user_ns.marshal_with(user_model, code=201)
     def post(self):
         """Создать нового пользователя"""
-        # Логика создания пользователя
-        return {}, 201
+        data = request.json or {}
+        user = User(
+            username=data.get('username'),
+            password_hash=generate_password_hash(
+                data.get('password', ''),
+                method=current_app.config['PASSWORD_HASH_METHOD'])
+        )
+        try:
+            db.session.add(user)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return user, 201
+
+@user_ns.route('/<string:username>')
+@user_ns.param('username', 'Имя пользователя')
+class UserByUsername(Resource):
+    @user_ns.doc('get_user_by_username')
+    def get(self, username):
+        """Получить пользователя по имени"""
+        user = User.get_by_username(username)
+        if user is None:
+            return {'message': 'User not found'}, 404
+        return {'id': user.id, 'username': user.username}
 
 @user_ns.route('/<int:id>')
 @user_ns.param('id', 'ID пользователя')
@@ -1,5 +1,5 @@
 from flask_restx import Namespace, Resource, fields
-from flask import request
+from flask import request, current_app
 from .. import api, db
 from ..models.user import User
 from flask_jwt_extended import (
@@ -61,7 +61,9 @@ class Register(Resource):
             
         new_user = User(
             username=data['username'],
-            password_hash=generate_password_hash(data['password'])
+            password_hash=generate_password_hash(
+                data['password'],
+                method=current_app.config['PASSWORD_HASH_METHOD'])
         )
         
         try:
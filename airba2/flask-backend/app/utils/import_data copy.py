@@ -611,4 +611,5 @@ def import_all_data():
         raise
     
     
-import_all_data()
\ No newline at end of file
+if __name__ == '__main__':
+    import_all_data()
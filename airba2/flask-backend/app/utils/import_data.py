@@ -1,7 +1,13 @@
+import gc
 import os
+import pickle
+import re
+import numpy as np
 import pandas as pd
 import logging
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from flask import current_app
 from sqlalchemy.exc import IntegrityError
@@ -9,13 +15,119 @@ from sqlalchemy.orm import Session
 from .. import db
 from ..models.catalog import City, Store, CategoryGroup, Category, Product, Sale
 
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+# Настройка логирования: локальный обработчик вместо basicConfig,
+# чтобы не трогать корневой логгер всего приложения
 logger = logging.getLogger('data_import')
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter(
+        '%(asctime)s [%(levelname)s] - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    # Запись не должна подниматься к корневому логгеру (basicConfig в
+    # app/__init__.py) — иначе каждая строка выводится дважды
+    logger.propagate = False
+
+# Пытаемся использовать calamine (Rust) для чтения Excel — он в разы быстрее
+# чистопитоновского openpyxl и экономит память
+try:
+    from python_calamine import CalamineWorkbook
+    calamine_available = True
+except ImportError:
+    calamine_available = False
+
+# RapidFuzz (C++/SIMD) для нечеткого сопоставления имен — при наличии
+try:
+    from rapidfuzz import fuzz, process as rf_process
+    rapidfuzz_available = True
+except ImportError:
+    rapidfuzz_available = False
+
+# pyarrow читает CSV многопоточно и без копирования — используем при наличии
+try:
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pa_parquet
+    pyarrow_available = True
+except ImportError:
+    pyarrow_available = False
+
+def _ensure_parquet_cache(file_path):
+    """Гарантирует актуальный Parquet-кэш рядом с Excel файлом.
+
+    Первый запуск конвертирует файл один раз; кэш инвалидируется по
+    mtime исходника. Возвращает путь к кэшу или None, если pyarrow
+    недоступен или конвертация не удалась.
+    """
+    if not pyarrow_available:
+        return None
+    pq_path = file_path + '.parquet'
+    try:
+        if not os.path.exists(pq_path) or os.path.getmtime(pq_path) < os.path.getmtime(file_path):
+            pd.read_excel(file_path).to_parquet(pq_path)
+            logger.info(f"Создан Parquet-кэш {pq_path}")
+        return pq_path
+    except Exception as e:
+        logger.warning(f"Parquet-кэш для {file_path} недоступен: {str(e)}")
+        return None
+
+def _excel_via_parquet(file_path, usecols=None):
+    """Возвращает DataFrame из Parquet-кэша рядом с исходным Excel.
+
+    Чтение колоночного Parquet на порядок быстрее разбора XLSX.
+    Возвращает None, если кэш недоступен.
+    """
+    pq_path = _ensure_parquet_cache(file_path)
+    if pq_path is None:
+        return None
+    try:
+        if usecols is not None:
+            # Parquet отдает только запрошенные колонки, остальные не читаются
+            names = pa_parquet.read_schema(pq_path).names
+            return pd.read_parquet(pq_path, columns=[c for c in names if usecols(c)])
+        return pd.read_parquet(pq_path)
+    except Exception as e:
+        logger.warning(f"Parquet-кэш для {file_path} недоступен: {str(e)}")
+        return None
+
+def read_excel_fast(file_path, usecols=None, nrows=None):
+    """Читает первый лист Excel файла в DataFrame.
+
+    Использует python-calamine, если он установлен, с откатом на
+    стандартный pd.read_excel (openpyxl). usecols (функция-фильтр по
+    имени колонки) и nrows позволяют не материализовывать лишние ячейки.
+    """
+    if nrows is None:
+        cached = _excel_via_parquet(file_path, usecols)
+        if cached is not None:
+            return cached
+    if calamine_available:
+        try:
+            rows = CalamineWorkbook.from_path(file_path).get_sheet_by_index(0).to_python()
+            if rows:
+                df = pd.DataFrame(rows[1:], columns=rows[0])
+                if nrows is not None:
+                    df = df.head(nrows)
+                if usecols is not None:
+                    df = df[[c for c in df.columns if usecols(c)]]
+                return df
+        except Exception as e:
+            logger.warning(f"Не удалось прочитать {file_path} через calamine: {str(e)}")
+    return pd.read_excel(file_path, usecols=usecols, nrows=nrows)
+
+def _unique_column_slice(args):
+    """Возвращает уникальные значения одной колонки из среза CSV.
+
+    Выполняется в дочернем процессе пула: каждый процесс читает свой
+    диапазон строк сам, поэтому DataFrame-ы между процессами не
+    пересылаются.
+    """
+    file_path, encoding, column, start, nrows = args
+    chunk = pd.read_csv(
+        file_path, encoding=encoding, usecols=[column],
+        skiprows=range(1, start + 1), nrows=nrows
+    )
+    values = chunk[column].dropna().drop_duplicates().astype(str).str.strip()
+    return set(v for v in values if v)
 
 def clean_string(value):
     """Очищает строковые значения от лишних пробелов"""
@@ -29,99 +141,214 @@ def handle_null(value, default=""):
         return default
     return value
 
+# Строка, похожая на число: цифры с разделителями пробел/точка/запятая;
+# допускается и запись без целой части ('.5', '-.5')
+_NUM_RE = re.compile(r'^\s*-?(?:\d[\d\s.,]*|\.\d[\d\s,]*)\s*$')
+
 def parse_float(value, default=None):
     """Безопасно преобразует значение в float"""
     if pd.isna(value):
         return default
-    
+
     if isinstance(value, (int, float)):
         return float(value)
-    
+
     if isinstance(value, str):
         value = value.strip()
         # Если значение '-' или пустое, вернем None
         if value == '-' or value == '':
             return default
-        
-        # Проверка на очевидно текстовое значение (игнорируем, если в строке больше 3 букв и нет цифр)
-        alpha_count = sum(c.isalpha() for c in value)
-        digit_count = sum(c.isdigit() for c in value)
-        
-        if alpha_count > 3 and digit_count == 0:
-            return default
-        
-        # Попробуем преобразовать строку в число
-        try:
-            # Замена запятой на точку для поддержки разных форматов чисел
-            value = value.replace(',', '.')
-            return float(value)
-        except ValueError:
-            # Выводим предупреждение только если строка похожа на число
-            if digit_count > 0:
-                logger.warning(f"Не удалось преобразовать '{value}' в число, использую {default}")
-            return default
-    
+
+        # Одна проверка регулярным выражением вместо посимвольного
+        # подсчета букв и цифр
+        if _NUM_RE.match(value):
+            try:
+                # Убираем пробелы-разделители, запятую меняем на точку
+                return float(value.replace(' ', '').replace(',', '.'))
+            except ValueError:
+                pass
+
+        # Выводим предупреждение только если строка похожа на число
+        if any(c.isdigit() for c in value):
+            # Ленивые %s-аргументы: строка форматируется только при выводе
+            logger.warning("Не удалось преобразовать '%s' в число, использую %s", value, default)
+        return default
+
     return default
 
+def clean_text_column(series):
+    """Векторный аналог clean_string/handle_null для целой колонки"""
+    return series.astype('string').str.strip().fillna('')
+
+def numeric_column(series, default=None):
+    """Векторный аналог parse_float для целой колонки"""
+    # Та же нормализация, что в parse_float: пробелы-разделители разрядов
+    # убираются, запятая становится точкой ('1 200,50' -> 1200.5)
+    numeric = pd.to_numeric(
+        series.astype('string').str.strip()
+              .str.replace(' ', '', regex=False)
+              .str.replace(',', '.', regex=False),
+        errors='coerce'
+    )
+    if default is not None:
+        numeric = numeric.fillna(default)
+    return numeric
+
+@contextmanager
+def bulk_session():
+    """Отключает autoflush и expire_on_commit на время массового импорта.
+
+    Autoflush заставляет ORM сбрасывать отложенные объекты перед каждым
+    запросом — при пакетной загрузке это лишние SQL-обращения
+    (первый пункт из FAQ SQLAlchemy по производительности).
+    Expire_on_commit перечитывал бы объекты из БД после COMMIT — импортер
+    только пишет, поэтому и это лишние SELECT. Обе настройки локальны для
+    сессии импорта, веб-запросы работают со стандартной семантикой.
+    """
+    session = db.session()
+    prev_autoflush = session.autoflush
+    prev_expire = session.expire_on_commit
+    session.autoflush = False
+    session.expire_on_commit = False
+    try:
+        yield session
+    finally:
+        session.autoflush = prev_autoflush
+        session.expire_on_commit = prev_expire
+
+def insert_ignore_duplicates(model, rows):
+    """Пакетная вставка с пропуском дубликатов (INSERT ... ON CONFLICT DO NOTHING).
+
+    Дедупликация выполняется движком БД за один запрос на пакет вместо
+    пары SELECT + INSERT на каждую строку. ON CONFLICT без явной цели:
+    на PostgreSQL именованная цель требует подходящего уникального
+    индекса, которого в базах, созданных до его появления в моделях,
+    нет (create_all существующие таблицы не меняет), а гасить здесь
+    нужно любой конфликт уникальности.
+    Возвращает количество реально вставленных строк.
+    """
+    if not rows:
+        return 0
+
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        stmt = pg_insert(table).on_conflict_do_nothing()
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        stmt = sqlite_insert(table).on_conflict_do_nothing()
+    else:
+        # Для остальных диалектов полагаемся на UNIQUE-индексы
+        stmt = table.insert()
+
+    result = db.session.execute(stmt, rows)
+    return result.rowcount if result.rowcount and result.rowcount > 0 else 0
+
+def copy_into_table(table_name, columns, rows):
+    """Грузит строки в таблицу PostgreSQL через COPY FROM STDIN.
+
+    COPY передает данные одним потоком CSV мимо SQL-парсера и поэтому
+    быстрее даже пакетного INSERT. Идет по соединению текущей сессии:
+    строки попадают в ту же транзакцию, что DELETE/TRUNCATE и обычные
+    вставки, и фиксируются единственным COMMIT вызывающего кода.
+    Отдельное соединение здесь ломало бы атомарность импорта и вставало
+    бы в вечное ожидание блокировок, которые держит транзакция сессии.
+    Возвращает False на других диалектах — вызывающий код должен
+    использовать обычную пакетную вставку.
+    """
+    if db.session.get_bind().dialect.name != 'postgresql':
+        return False
+
+    import csv
+    import io
+    buf = io.StringIO()
+    # csv.writer пишет кортежи напрямую — без постройки DataFrame на пакет
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+
+    dbapi_conn = db.session.connection().connection.driver_connection
+    with dbapi_conn.cursor() as cur:
+        cur.copy_expert(
+            f'COPY {table_name} ({", ".join(columns)}) FROM STDIN WITH CSV', buf
+        )
+    return True
+
+def save_sales_batch(product_ids, store_ids, quantities, prices, dates):
+    """Сохраняет пакет продаж из колоночных массивов.
+
+    Колонки приходят массивами (structure-of-arrays): COPY-путь на
+    PostgreSQL пишет их в CSV напрямую через zip, не собирая по словарю
+    на строку. Словари строятся только для фолбэк-вставки через Core.
+    Возвращает число сохраненных строк.
+    """
+    total = len(product_ids)
+    if total == 0:
+        return 0
+    columns = ['product_id', 'store_id', 'quantity', 'price', 'date']
+    # tolist() отдает родные int/float вместо numpy-скаляров — их понимает
+    # любой драйвер. Количество приводим к целому заранее: колонки приходят
+    # и float32 (импорт), а текстовый ввод COPY, в отличие от параметров
+    # INSERT, не приводит "2.0" к integer неявно
+    column_values = (product_ids.tolist(), store_ids.tolist(),
+                     np.rint(quantities).astype(np.int64).tolist(),
+                     prices.tolist(), dates)
+    if not copy_into_table('sales', columns, zip(*column_values)):
+        # Core-вставка без построения ORM-объектов и управления identity map
+        rows = [dict(zip(columns, values)) for values in zip(*column_values)]
+        db.session.execute(Sale.__table__.insert(), rows)
+    return total
+
+# Предкомпилированные таблицы шаблонов для классификации колонок:
+# одна скомпилированная альтернация вместо any(pattern in col.lower() for ...)
+_PRICE_RE = re.compile(r'price|цена|стоимость|сумма|руб|с ндс|без ндс', re.IGNORECASE)
+_PRICE_EXCLUDE_RE = re.compile(
+    r'скидк|discount|trade|акци|каскад|подар|менеджер|директор|другое|основани', re.IGNORECASE)
+_PRODUCT_RE = re.compile(r'това|product|model|наименование изд|наименование тов', re.IGNORECASE)
+_STORE_RE = re.compile(r'магаз|store|shop|точка продаж|офис', re.IGNORECASE)
+_QUANTITY_RE = re.compile(r'quant|кол|шт|колич|count', re.IGNORECASE)
+_DATE_RE = re.compile(r'дата|date|time|время|день', re.IGNORECASE)
+
 def find_price_columns(df):
     """Находит колонки с ценами в DataFrame"""
+    # Классификация заголовков одним проходом регулярного выражения
+    # по Index вместо вложенного цикла колонки × шаблоны
+    cols = pd.Index(df.columns).astype(str)
+    excluded = cols.str.contains(_PRICE_EXCLUDE_RE, na=False)
+    priority = cols.str.contains(_PRICE_RE, na=False) & ~excluded
+
+    # Небольшая выборка строк для проверки числового содержимого
+    sample = df.head(min(5, len(df)))
+    sample_rows = len(sample)
+
     price_columns = []
-    exclude_patterns = ['скидк', 'discount', 'trade', 'акци', 'каскад', 'подар', 'менеджер', 'директор', 'другое', 'основани']
-    
-    # Сначала проверяем наиболее вероятные колонки с ценами
-    priority_patterns = ['price', 'цена', 'стоимость', 'сумма', 'руб', 'с ндс', 'без ндс', 'gs, с ндс', 'ns, с ндс']
-    
-    # Проверка первых нескольких строк, чтобы определить, содержит ли колонка числа
-    sample_rows = min(5, len(df))
-    
-    for col in df.columns:
-        col_lower = str(col).lower()
-        
-        # Пропускаем колонки, которые вероятно содержат текстовые описания скидок
-        if any(pattern in col_lower for pattern in exclude_patterns):
+    for col, is_priority in zip(df.columns, priority):
+        if not is_priority:
             continue
-            
-        # Сначала проверяем приоритетные шаблоны
-        if any(pattern in col_lower for pattern in priority_patterns):
-            # Проверяем, содержит ли колонка числа в первых строках
-            has_numbers = False
-            for i in range(sample_rows):
-                if i < len(df):
-                    val = df.iloc[i][col]
-                    if isinstance(val, (int, float)) or (isinstance(val, str) and any(c.isdigit() for c in val)):
-                        has_numbers = True
-                        break
-            
-            if has_numbers:
-                price_columns.append(col)
-                
+        # Проверяем, содержит ли колонка числа в первых строках —
+        # одной строковой операцией по выборке вместо посимвольного прохода
+        has_numbers = bool(sample[col].astype('string').str.contains(r'\d', na=False).any())
+        if has_numbers:
+            price_columns.append(col)
+
     # Если не нашли приоритетные колонки, ищем любые колонки с числовыми данными
     if not price_columns:
-        for col in df.columns:
-            col_lower = str(col).lower()
-            if any(pattern in col_lower for pattern in exclude_patterns):
+        for col, is_excluded in zip(df.columns, excluded):
+            if is_excluded:
                 continue
-                
+
             # Проверяем, содержит ли колонка числа в большинстве строк
-            numeric_count = 0
-            for i in range(sample_rows):
-                if i < len(df):
-                    val = df.iloc[i][col]
-                    if isinstance(val, (int, float)) or (isinstance(val, str) and val.replace('.', '', 1).replace(',', '', 1).isdigit()):
-                        numeric_count += 1
-                        
+            numeric_count = int(numeric_column(sample[col]).notna().sum())
             if numeric_count >= sample_rows // 2:
                 price_columns.append(col)
-    
+
     logger.info(f"Найдены колонки с ценами: {price_columns}")
     return price_columns
 
 def find_product_column(df):
     """Находит колонку с названиями товаров"""
     for col in df.columns:
-        col_lower = str(col).lower()
-        if ('това' in col_lower or 'product' in col_lower or 'model' in col_lower or 
-            'наименование изд' in col_lower or 'наименование тов' in col_lower):
+        if _PRODUCT_RE.search(str(col)):
             logger.info(f"Найдена колонка с товарами: {col}")
             return col
     
@@ -132,9 +359,7 @@ def find_product_column(df):
 def find_store_column(df):
     """Находит колонку с названиями магазинов"""
     for col in df.columns:
-        col_lower = str(col).lower()
-        if ('магаз' in col_lower or 'store' in col_lower or 'shop' in col_lower or 
-            'точка продаж' in col_lower or 'офис' in col_lower):
+        if _STORE_RE.search(str(col)):
             logger.info(f"Найдена колонка с магазинами: {col}")
             return col
     
@@ -145,9 +370,7 @@ def find_store_column(df):
 def find_quantity_column(df):
     """Находит колонку с количеством"""
     for col in df.columns:
-        col_lower = str(col).lower()
-        if ('quant' in col_lower or 'кол' in col_lower or 'шт' in col_lower or 
-            'колич' in col_lower or 'count' in col_lower):
+        if _QUANTITY_RE.search(str(col)):
             logger.info(f"Найдена колонка с количеством: {col}")
             return col
     
@@ -158,9 +381,7 @@ def find_quantity_column(df):
 def find_date_column(df):
     """Находит колонку с датой"""
     for col in df.columns:
-        col_lower = str(col).lower()
-        if ('дата' in col_lower or 'date' in col_lower or 'time' in col_lower or 
-            'время' in col_lower or 'день' in col_lower):
+        if _DATE_RE.search(str(col)):
             logger.info(f"Найдена колонка с датой: {col}")
             return col
     
@@ -184,7 +405,7 @@ def import_store_info(file_path):
         
         # Читаем Excel файл
         logger.info(f"Чтение файла {file_path}...")
-        df = pd.read_excel(file_path)
+        df = read_excel_fast(file_path)
         logger.info(f"Прочитано {len(df)} строк из файла")
         logger.info(f"Колонки в файле: {df.columns.tolist()}")
         
@@ -214,93 +435,99 @@ def import_store_info(file_path):
         if not address_column:
             address_column = 'Адрес магазина'
             logger.warning(f"Колонка с адресами не найдена, использую '{address_column}'")
-        
-        # Сначала создаем все города и коммитим их
+
+        # Векторная очистка колонок вместо скалярных помощников в цикле
+        region_column = 'Направление ПВЗ (регион)'
+        for col in {city_column, store_column, address_column, region_column} & set(df.columns):
+            df[col] = clean_text_column(df[col])
+
+        # Размер магазина: "Общая площадь" с запасным вариантом "Торговая площадь"
+        sizes = None
+        for col in ('Общая площадь', 'Торговая площадь'):
+            if col in df.columns:
+                numeric = numeric_column(df[col])
+                sizes = numeric if sizes is None else sizes.combine_first(numeric)
+        df['_size'] = sizes
+
+
+        # Сначала создаем все города одним пакетом;
+        # дедупликация через drop_duplicates вместо построчного прохода.
+        # Файл без колонки городов не роняет импорт: городов просто не
+        # будет, а магазины без города отфильтрует проверка ниже
         cities_dict = {}
-        for idx, row in df.iterrows():
-            city_name = clean_string(handle_null(row.get(city_column)))
-            if not city_name:
-                continue
-                
-            # Добавляем город только если его еще нет в словаре
-            if city_name not in cities_dict:
-                region = clean_string(handle_null(row.get('Направление ПВЗ (регион)', '')))
-                
-                # Проверяем существует ли уже город
-                city = City.query.filter_by(name=city_name).first()
-                if not city:
-                    city = City(name=city_name, region=region)
-                    db.session.add(city)
-                    cities_counter += 1
-                    logger.debug(f"Создан новый город: {city_name}, регион: {region}")
-        
-        # Коммитим все города перед добавлением магазинов
+        city_rows = []
+        if city_column in df.columns:
+            unique_cities = df.drop_duplicates(subset=[city_column])
+            if region_column in unique_cities.columns:
+                regions = unique_cities[region_column]
+            else:
+                regions = [''] * len(unique_cities)
+
+            for city_name, region in zip(unique_cities[city_column], regions):
+                if not city_name:
+                    continue
+                city_rows.append({'name': city_name, 'region': region})
+        else:
+            logger.warning(f"Колонка с городами '{city_column}' не найдена в файле")
+
+        # Дубликаты с уже существующими городами отбрасывает сама БД
+        cities_counter = insert_ignore_duplicates(City, city_rows)
         if cities_counter > 0:
-            logger.info(f"Сохранение {cities_counter} городов...")
-            db.session.commit()
+            # flush вместо commit: города становятся видны запросам ниже,
+            # но COMMIT (fsync) выполняется один раз в конце импорта
+            db.session.flush()
             logger.info(f"Сохранено {cities_counter} городов")
         
-        # Обновляем словарь городов из базы данных
-        cities = City.query.all()
-        for city in cities:
-            cities_dict[city.name] = city.id
+        # Обновляем словарь городов из базы данных (только нужные колонки)
+        cities_dict = {name: city_id for name, city_id in db.session.query(City.name, City.id)}
         
         logger.info(f"Загружено {len(cities_dict)} городов из базы данных")
         
-        # Теперь добавляем магазины
-        for idx, row in df.iterrows():
-            if idx > 0 and idx % 100 == 0:
-                logger.info(f"Обработано {idx}/{len(df)} строк данных о магазинах")
-                
-            store_id = row.get('store_id')
+        # Дедупликация по имени магазина тоже через drop_duplicates,
+        # а не через словарь в цикле
+        unique_stores = df.drop_duplicates(subset=[store_column]) if store_column in df.columns else df
+
+        # Вместо iterrows (Series на каждую строку) идем zip-ом по готовым колонкам
+        def column_or_default(col, default=None):
+            if col in unique_stores.columns:
+                return unique_stores[col]
+            return pd.Series([default] * len(unique_stores), index=unique_stores.index)
+
+        # Теперь добавляем магазины одним пакетом
+        store_rows = []
+        for store_id, store_name, address, city_name, size_value in zip(
+                column_or_default('store_id'),
+                column_or_default(store_column, ''),
+                column_or_default(address_column, ''),
+                column_or_default(city_column, ''),
+                unique_stores['_size']):
             if pd.isna(store_id):
                 continue
-                
-            store_name = clean_string(handle_null(row.get(store_column)))
+
             if not store_name:
                 continue
-                
-            address = clean_string(handle_null(row.get(address_column)))
-            
+
             # Получаем город для магазина
-            city_name = clean_string(handle_null(row.get(city_column)))
             if not city_name or city_name not in cities_dict:
                 logger.warning(f"Город '{city_name}' не найден для магазина '{store_name}', пропуск")
                 continue
-            
-            # Безопасно преобразуем размер магазина
-            size_value = row.get('Общая площадь')
-            if pd.isna(size_value):
-                size_value = row.get('Торговая площадь')
-            
-            size = parse_float(size_value)  # None, если не удалось преобразовать
-            
-            # Проверяем, существует ли магазин
-            store = Store.query.filter_by(name=store_name).first()
-            
-            if not store:
-                # Создаем новый магазин
-                store = Store(
-                    name=store_name,
-                    address=address,
-                    city_id=cities_dict[city_name],
-                    size=size,
-                    opening_date=datetime.now().date()  # Используем текущую дату, так как в файле нет даты открытия
-                )
-                db.session.add(store)
-                stores_counter += 1
-                logger.debug(f"Создан новый магазин: {store_name}, адрес: {address}, город: {city_name}")
-            
-            # Периодически делаем commit, чтобы не накапливать слишком много изменений
-            if stores_counter > 0 and stores_counter % 100 == 0:
-                db.session.commit()
-                logger.info(f"Сохранено {stores_counter} магазинов")
-                logger.info(f"Обработано {idx}/{len(df)} строк данных о магазинах")
-        
-        # Сохраняем изменения
-        if stores_counter % 100 != 0:  # Если были несохраненные изменения
-            db.session.commit()
-            
+
+            # Размер магазина уже приведен к числу векторно
+            size = None if pd.isna(size_value) else float(size_value)
+
+            store_rows.append({
+                'name': store_name,
+                'address': address,
+                'city_id': cities_dict[city_name],
+                'size': size,
+                'opening_date': datetime.now().date()  # Используем текущую дату, так как в файле нет даты открытия
+            })
+
+        # Уже существующие магазины отбрасывает сама БД.
+        # Единственный COMMIT на весь импорт магазинов
+        stores_counter = insert_ignore_duplicates(Store, store_rows)
+        db.session.commit()
+
         elapsed_time = time.time() - start_time
         logger.info(f"Успешно импортированы данные о магазинах. Создано {cities_counter} городов и {stores_counter} магазинов за {elapsed_time:.2f} секунд")
         
@@ -372,9 +599,7 @@ def import_product_categories(file_path):
                 if not quantity_column:
                     quantity_column = 'quant'
                     logger.warning(f"Колонка с количеством не найдена, использую '{quantity_column}'")
-                
-                # Используем chunks для обработки по частям
-                chunks = pd.read_csv(file_path, encoding=encoding, chunksize=chunk_size)
+
                 break
             except Exception as e:
                 logger.warning(f"Не удалось открыть файл с кодировкой {encoding}: {str(e)}")
@@ -382,210 +607,197 @@ def import_product_categories(file_path):
                     logger.error(f"Не удалось открыть файл ни с одной из кодировок")
                     raise
         
+        # Читаем файл один раз: многопоточный Arrow-парсер, если pyarrow установлен,
+        # и кэшируем таблицу в памяти, чтобы не перечитывать CSV на каждом шаге
+        cached_df = None
+        if pyarrow_available:
+            try:
+                table = pa_csv.read_csv(
+                    file_path,
+                    read_options=pa_csv.ReadOptions(block_size=8 << 20, encoding=encoding)
+                )
+                cached_df = table.to_pandas()
+                logger.info(f"Файл прочитан через pyarrow: {len(cached_df)} строк")
+            except Exception as e:
+                logger.warning(f"Не удалось прочитать {file_path} через pyarrow: {str(e)}")
+
+        def iter_chunks():
+            """Итерация по чанкам: срезы кэшированной таблицы или повторное чтение CSV"""
+            if cached_df is not None:
+                for start in range(0, len(cached_df), chunk_size):
+                    yield cached_df.iloc[start:start + chunk_size]
+            else:
+                yield from pd.read_csv(file_path, encoding=encoding, chunksize=chunk_size)
+
         # Шаг 1: Собираем все уникальные группы
         logger.info("Шаг 1: Обработка групп категорий...")
-        chunk_count = 0
         unique_groups = set()
-        
-        for chunk in chunks:
-            chunk_count += 1
-            logger.info(f"Обработка части {chunk_count} ({len(chunk)} строк)")
-            
-            # Собираем уникальные группы из текущего чанка
-            for group_name in chunk[group_column].dropna().unique():
-                group_name = clean_string(handle_null(group_name))
-                if group_name and group_name not in unique_groups:
-                    unique_groups.add(group_name)
-        
-        # Проверяем существующие группы в БД и создаем недостающие
-        logger.info(f"Найдено {len(unique_groups)} уникальных групп, проверка в БД...")
-        existing_groups = {g.name: g.id for g in CategoryGroup.query.all()}
-        
-        for group_name in unique_groups:
-            if group_name not in existing_groups:
-                group = CategoryGroup(name=group_name, description=f"Группа категорий {group_name}")
-                db.session.add(group)
-                groups_counter += 1
-        
-        # Сохраняем группы в БД
+
+        if cached_df is not None:
+            # pyarrow уже распарсил файл всеми ядрами — уникальные значения
+            # берем одним проходом по кэшированной таблице
+            groups = cached_df[group_column].dropna().drop_duplicates().astype(str).str.strip()
+            unique_groups.update(g for g in groups if g)
+            del groups
+        else:
+            # Разбор CSV ограничен CPU — раздаем непересекающиеся срезы строк
+            # процессам пула и объединяем готовые множества в родителе
+            with open(file_path, 'rb') as f:
+                total_rows = max(sum(1 for _ in f) - 1, 0)
+            slices = [(file_path, encoding, group_column, start, chunk_size)
+                      for start in range(0, total_rows, chunk_size)]
+            if len(slices) > 1:
+                with ProcessPoolExecutor() as pool:
+                    for values in pool.map(_unique_column_slice, slices):
+                        unique_groups |= values
+            elif slices:
+                unique_groups |= _unique_column_slice(slices[0])
+
+        # Создаем недостающие группы одним пакетом — дедупликация на стороне БД
+        logger.info(f"Найдено {len(unique_groups)} уникальных групп, сохранение в БД...")
+        group_rows = [
+            {'name': group_name, 'description': f"Группа категорий {group_name}"}
+            for group_name in unique_groups
+        ]
+        groups_counter = insert_ignore_duplicates(CategoryGroup, group_rows)
         if groups_counter > 0:
-            logger.info(f"Сохранение {groups_counter} новых групп категорий...")
-            db.session.commit()
+            db.session.flush()
             logger.info(f"Сохранено {groups_counter} групп категорий")
         
         # Обновляем словарь групп
-        group_dict = {g.name: g.id for g in CategoryGroup.query.all()}
+        group_dict = {name: group_id for name, group_id in
+                      db.session.query(CategoryGroup.name, CategoryGroup.id)}
         logger.info(f"Загружено {len(group_dict)} групп категорий из базы данных")
         
         # Шаг 2: Обработка категорий
         logger.info("Шаг 2: Обработка категорий...")
-        # Переоткрываем файл
-        chunks = pd.read_csv(file_path, encoding=encoding, chunksize=chunk_size)
         chunk_count = 0
         unique_categories = {}  # формат {(группа, категория): 1}
-        
-        for chunk in chunks:
+
+        def flush_categories(pending):
+            """Сохраняет накопленные категории одним пакетом; дубликаты отбрасывает БД"""
+            rows = [
+                {
+                    'name': category_name,
+                    'description': f"Категория {category_name}",
+                    'group_id': group_dict[group_name]
+                }
+                for (group_name, category_name) in pending
+            ]
+            inserted = insert_ignore_duplicates(Category, rows)
+            if inserted > 0:
+                db.session.flush()
+                logger.info(f"Сохранено {inserted} категорий")
+            return inserted
+
+        for chunk in iter_chunks():
             chunk_count += 1
-            logger.info(f"Обработка части {chunk_count} ({len(chunk)} строк)")
-            
-            # Фильтруем только строки с валидными группами и категориями
-            valid_data = chunk.dropna(subset=[group_column, category_column])
-            
-            for _, row in valid_data.iterrows():
-                group_name = clean_string(handle_null(row[group_column]))
-                category_name = clean_string(handle_null(row[category_column]))
-                
+            logger.debug("Обработка части %d (%d строк)", chunk_count, len(chunk))
+
+            # Фильтруем только строки с валидными группами и категориями,
+            # дубликаты убираем на уровне DataFrame
+            unique_gc = (chunk[[group_column, category_column]]
+                         .dropna()
+                         .drop_duplicates())
+
+            for group_name, category_name in zip(
+                    unique_gc[group_column].astype(str).str.strip(),
+                    unique_gc[category_column].astype(str).str.strip()):
                 if group_name and category_name and group_name in group_dict:
-                    category_key = (group_name, category_name)
-                    unique_categories[category_key] = 1
-            
-            # Чтобы не хранить все категории в памяти, периодически создаем их в БД
-            if len(unique_categories) > 10000 or chunk_count % 10 == 0:
-                # Получаем существующие категории
-                existing_categories = {}
-                for category in Category.query.all():
-                    group = CategoryGroup.query.get(category.group_id)
-                    if group:
-                        existing_categories[(group.name, category.name)] = category.id
-                
-                # Создаем недостающие категории
-                new_categories = []
-                for (group_name, category_name) in unique_categories:
-                    if (group_name, category_name) not in existing_categories:
-                        category = Category(
-                            name=category_name, 
-                            description=f"Категория {category_name}", 
-                            group_id=group_dict[group_name]
-                        )
-                        db.session.add(category)
-                        new_categories.append((group_name, category_name))
-                        categories_counter += 1
-                
-                # Сохраняем новые категории
-                if new_categories:
-                    logger.info(f"Сохранение {len(new_categories)} новых категорий...")
-                    db.session.commit()
-                    logger.info(f"Сохранено {len(new_categories)} категорий")
-                
-                # Обновляем словарь категорий
-                for category in Category.query.all():
-                    group = CategoryGroup.query.get(category.group_id)
-                    if group:
-                        category_key = f"{group.name}_{category.name}"
-                        category_dict[category_key] = category.id
-                
-                # Очищаем словарь уникальных категорий
+                    unique_categories[(group_name, category_name)] = 1
+
+            # Явно освобождаем чанк, чтобы он не висел в кадре генератора
+            del chunk, unique_gc
+
+            # Чтобы не хранить все категории в памяти, сбрасываем в БД
+            # только когда накопилось достаточно строк
+            if len(unique_categories) > 10000:
+                categories_counter += flush_categories(unique_categories)
                 unique_categories = {}
-        
+
         # Обрабатываем оставшиеся категории
         if unique_categories:
-            # Получаем существующие категории
-            existing_categories = {}
-            for category in Category.query.all():
-                group = CategoryGroup.query.get(category.group_id)
-                if group:
-                    existing_categories[(group.name, category.name)] = category.id
-            
-            # Создаем недостающие категории
-            new_categories = []
-            for (group_name, category_name) in unique_categories:
-                if (group_name, category_name) not in existing_categories:
-                    category = Category(
-                        name=category_name, 
-                        description=f"Категория {category_name}", 
-                        group_id=group_dict[group_name]
-                    )
-                    db.session.add(category)
-                    new_categories.append((group_name, category_name))
-                    categories_counter += 1
-            
-            # Сохраняем новые категории
-            if new_categories:
-                logger.info(f"Сохранение {len(new_categories)} новых категорий...")
-                db.session.commit()
-                logger.info(f"Сохранено {len(new_categories)} категорий")
+            categories_counter += flush_categories(unique_categories)
         
-        # Финальное обновление словаря категорий
-        category_dict = {}
-        for category in Category.query.all():
-            group = CategoryGroup.query.get(category.group_id)
-            if group:
-                category_key = f"{group.name}_{category.name}"
-                category_dict[category_key] = category.id
+        # Финальное обновление словаря категорий; ключ — кортеж (группа, категория),
+        # как в unique_categories. Один JOIN вместо запроса группы на каждую категорию
+        category_dict = {
+            (group_name, category_name): category_id
+            for group_name, category_name, category_id in db.session.query(
+                CategoryGroup.name, Category.name, Category.id
+            ).join(Category, Category.group_id == CategoryGroup.id)
+        }
         
         logger.info(f"Загружено {len(category_dict)} категорий из базы данных")
         
         # Шаг 3: Обработка товаров 
         logger.info("Шаг 3: Обработка товаров...")
-        # Переоткрываем файл
-        chunks = pd.read_csv(file_path, encoding=encoding, chunksize=chunk_size)
         chunk_count = 0
         
         # Вместо загрузки всех товаров в БД сразу, обрабатываем по частям
-        for chunk in chunks:
+        for chunk in iter_chunks():
             chunk_count += 1
-            logger.info(f"Обработка части {chunk_count} ({len(chunk)} строк)")
-            
-            # Фильтруем только строки с валидными группами, категориями и моделями
-            valid_data = chunk.dropna(subset=[group_column, category_column, model_column])
+            logger.debug("Обработка части %d (%d строк)", chunk_count, len(chunk))
             
-            # Получаем существующие товары для этого чанка
-            models = [clean_string(handle_null(m)) for m in valid_data[model_column] if not pd.isna(m)]
-            existing_products = {}
-            
-            # Оптимизация: загружаем только товары, которые есть в этом чанке
-            if models:
-                for product in Product.query.filter(Product.name.in_(models)).all():
-                    existing_products[product.name] = product.id
-            
-            # Создаем новые товары
-            batch_products = []
-            batch_size = 1000
-            
-            for _, row in valid_data.iterrows():
-                group_name = clean_string(handle_null(row[group_column]))
-                category_name = clean_string(handle_null(row[category_column]))
-                model = clean_string(handle_null(row[model_column]))
-                
+            # Фильтруем только строки с валидными группами, категориями и моделями;
+            # повторы моделей внутри чанка убираем сразу на уровне DataFrame
+            valid_data = (chunk.dropna(subset=[group_column, category_column, model_column])
+                          .drop_duplicates(subset=[model_column]))
+
+            # Создаем новые товары — по одному пакету на чанк,
+            # уже существующие отбрасывает сама БД (ON CONFLICT DO NOTHING)
+            product_rows = {}
+
+            # Векторная очистка колонок вместо скалярных помощников в цикле
+            group_names = clean_text_column(valid_data[group_column])
+            category_names = clean_text_column(valid_data[category_column])
+            models = clean_text_column(valid_data[model_column])
+            if quantity_column in valid_data.columns:
+                quants = numeric_column(valid_data[quantity_column], default=0)
+            else:
+                quants = pd.Series(0, index=valid_data.index)
+
+            for group_name, category_name, model, quant in zip(
+                    group_names, category_names, models, quants):
                 if not group_name or not category_name or not model:
                     continue
-                
-                # Создаем ключ для категории
-                category_key = f"{group_name}_{category_name}"
-                
+
+                # Ключ категории — кортеж, без аллокации новой строки
+                category_key = (group_name, category_name)
+
                 # Пропускаем, если категория не найдена
                 if category_key not in category_dict:
                     continue
-                
-                # Пропускаем, если товар уже существует
-                if model in existing_products:
+
+                # Пропускаем дубликат внутри чанка
+                if model in product_rows:
                     continue
-                
-                quant = parse_float(row.get(quantity_column, 0), default=0)
-                
-                # Создаем новый товар
-                product = Product(
-                    name=model,
-                    description=f"Товар {model}",
-                    price=0,  # Временная цена, будет обновлена при импорте продаж
-                    stock=quant,
-                    category_id=category_dict[category_key]
-                )
-                db.session.add(product)
-                products_counter += 1
-                batch_products.append(model)
-                
-                # Сохраняем пакет товаров
-                if len(batch_products) >= batch_size:
-                    db.session.commit()
-                    logger.info(f"Сохранено {products_counter} товаров (пакет {len(batch_products)})")
-                    batch_products = []
-            
-            # Сохраняем оставшиеся товары в пакете
-            if batch_products:
-                db.session.commit()
-                logger.info(f"Сохранено {products_counter} товаров (последний пакет {len(batch_products)})")
-        
+
+                product_rows[model] = {
+                    'name': model,
+                    'description': f"Товар {model}",
+                    'price': 0,  # Временная цена, будет обновлена при импорте продаж
+                    # int() приводит numpy/pandas-скаляр к родному типу:
+                    # numpy.int64 драйверы либо не понимают (psycopg2),
+                    # либо пишут как BLOB (sqlite3)
+                    'stock': int(quant),
+                    'category_id': category_dict[category_key]
+                }
+
+            # Сохраняем пакет товаров
+            inserted = insert_ignore_duplicates(Product, list(product_rows.values()))
+            if inserted > 0:
+                products_counter += inserted
+                db.session.flush()
+                logger.info(f"Сохранено {products_counter} товаров (пакет {inserted})")
+
+            # Явно освобождаем чанк и промежуточные колонки перед следующим
+            del chunk, valid_data, product_rows, group_names, category_names, models, quants
+            gc.collect()
+
+        # Единственный COMMIT на весь импорт категорий и товаров
+        db.session.commit()
+
         elapsed_time = time.time() - start_time
         logger.info(f"Успешно импортированы категории и товары. Создано {groups_counter} групп, {categories_counter} категорий и {products_counter} товаров за {elapsed_time:.2f} секунд")
         
@@ -612,35 +824,36 @@ def import_sales(file_path):
         
         # Читаем Excel файл и анализируем колонки
         logger.info(f"Чтение файла {file_path}...")
-        
-        # Попробуем несколько вариантов для надежности
+
+        # Сначала читаем небольшую выборку и определяем по ней нужные колонки,
+        # затем перечитываем файл целиком уже с usecols — лишние колонки
+        # большого файла продаж вообще не материализуются
         try:
-            df = pd.read_excel(file_path)
+            sample = read_excel_fast(file_path, nrows=50)
         except Exception as e:
             logger.warning(f"Ошибка при чтении Excel файла: {str(e)}")
             try:
                 # Попробуем с явным указанием engine
-                df = pd.read_excel(file_path, engine='openpyxl')
+                sample = pd.read_excel(file_path, engine='openpyxl', nrows=50)
             except Exception as e2:
                 logger.error(f"Не удалось прочитать файл при второй попытке: {str(e2)}")
                 raise
-        
-        logger.info(f"Прочитано {len(df)} строк из файла")
+
         logger.info(f"Первые несколько строк файла:")
         try:
-            logger.info(df.head(3).to_string())
+            logger.info(sample.head(3).to_string())
         except:
             pass
-        
-        logger.info(f"Колонки в файле: {df.columns.tolist()}")
-        
+
+        logger.info(f"Колонки в файле: {sample.columns.tolist()}")
+
         # Определяем колонки для работы
-        price_columns = find_price_columns(df)
-        product_column = find_product_column(df)
-        store_column = find_store_column(df)
-        quantity_column = find_quantity_column(df)
-        date_column = find_date_column(df)
-        
+        price_columns = find_price_columns(sample)
+        product_column = find_product_column(sample)
+        store_column = find_store_column(sample)
+        quantity_column = find_quantity_column(sample)
+        date_column = find_date_column(sample)
+
         logger.info(f"Найдены колонки для импорта:")
         logger.info(f"- Товары: {product_column}")
         logger.info(f"- Магазины: {store_column}")
@@ -668,150 +881,313 @@ def import_sales(file_path):
         if not price_columns:
             price_columns = ['Price', 'NS, с НДС', 'GS, с НДС']
             logger.info(f"Используем фиксированные колонки для цен: {price_columns}")
-        
+
+        # Полное чтение: только определенные выше колонки. При наличии
+        # Parquet-кэша файл читается порциями фиксированного размера —
+        # пиковая память не зависит от объема файла, а вставка в БД
+        # перемежается с разбором следующей порции
+        wanted_columns = {product_column, store_column, quantity_column, date_column}
+        wanted_columns.update(price_columns)
+        pq_path = _ensure_parquet_cache(file_path)
+
+        def iter_sales_frames():
+            """Отдает файл продаж порциями DataFrame"""
+            if pq_path is not None:
+                parquet_file = pa_parquet.ParquetFile(pq_path)
+                batch_columns = [c for c in parquet_file.schema_arrow.names if c in wanted_columns]
+                for batch in parquet_file.iter_batches(batch_size=100000, columns=batch_columns):
+                    yield batch.to_pandas()
+                return
+            try:
+                yield read_excel_fast(file_path, usecols=lambda c: c in wanted_columns)
+            except Exception as e:
+                logger.warning(f"Ошибка при чтении Excel файла: {str(e)}")
+                yield pd.read_excel(file_path, engine='openpyxl',
+                                    usecols=lambda c: c in wanted_columns)
+
         # Загружаем все магазины и товары в память для быстрого поиска
         logger.info("Загрузка магазинов из базы данных...")
         store_dict = {}
-        stores = Store.query.all()
-        for store in stores:
-            store_dict[store.name] = store.id
+        for name, store_id in db.session.query(Store.name, Store.id):
+            store_dict[name] = store_id
             # Добавим более короткие версии имени для лучшего матчинга
-            short_name = store.name.split()[0] if ' ' in store.name else store.name
+            short_name = name.split()[0] if ' ' in name else name
             if short_name and len(short_name) > 3 and short_name not in store_dict:
-                store_dict[short_name] = store.id
+                store_dict[short_name] = store_id
         
         logger.info("Загрузка товаров из базы данных...")
         product_dict = {}
-        products = Product.query.all()
-        for product in products:
-            product_dict[product.name] = (product.id, product.price)
+        # Цены держим отдельно по id: псевдонимы, добавленные нечетким
+        # сопоставлением, разрешаются в канонический id и через него
+        # наследуют настоящую цену товара
+        price_by_id = {}
+        for name, product_id, price in db.session.query(Product.name, Product.id, Product.price):
+            product_dict[name] = (product_id, price)
+            price_by_id[product_id] = price
         
         logger.info(f"Загружено {len(store_dict)} магазинов и {len(product_dict)} товаров из базы данных")
-        
-        # Создаем записи о продажах (один проход для простоты)
+
+        # Дисковый кэш нечетких соответствий: повторный импорт того же файла
+        # не повторяет дорогой fuzzy-проход. Ключ — mtime и размер исходника
+        alias_cache_path = file_path + '.aliases.pkl'
+        cache_key = (os.path.getmtime(file_path), os.path.getsize(file_path))
+        store_aliases = {}
+        product_aliases = {}
+        try:
+            with open(alias_cache_path, 'rb') as f:
+                cached = pickle.load(f)
+            if cached.get('key') == cache_key:
+                # Применяем только псевдонимы, чьи канонические имена всё еще в БД
+                for alias, canonical in cached.get('stores', {}).items():
+                    if canonical in store_dict and alias not in store_dict:
+                        store_dict[alias] = store_dict[canonical]
+                for alias, canonical in cached.get('products', {}).items():
+                    if canonical in product_dict and alias not in product_dict:
+                        product_dict[alias] = (product_dict[canonical][0], 0)
+                logger.info("Загружен кэш нечетких соответствий имен")
+        except (OSError, pickle.PickleError, EOFError, AttributeError):
+            pass
+
+        # Создаем записи о продажах, порция за порцией
         batch_size = 5000
-        sales_batch = []
-        
-        for idx, row in df.iterrows():
-            if idx > 0 and idx % 1000 == 0:
-                logger.info(f"Обработано {idx}/{len(df)} строк данных о продажах. Создано {sales_counter} записей о продажах")
-            
-            # Получаем название магазина и товара
-            store_name = clean_string(handle_null(row.get(store_column)))
-            item_name = clean_string(handle_null(row.get(product_column)))
-            
-            if not store_name or not item_name:
-                continue
-            
-            # Находим ID магазина с более гибким поиском
-            store_id = None
-            if store_name in store_dict:
-                store_id = store_dict[store_name]
+
+        avg_price = None  # считается лениво, одним агрегатным запросом
+
+        def process_sales_frame(df):
+            """Обрабатывает одну порцию продаж: чистка, разрешение id, вставка"""
+            nonlocal sales_counter, avg_price
+
+            def column_or_default(col, default=None):
+                if col in df.columns:
+                    return df[col]
+                return pd.Series([default] * len(df), index=df.index)
+
+            # Сжимаем типы: имена магазинов/товаров повторяются миллионы раз
+            # при нескольких тысячах уникальных — category хранит каждое имя
+            # один раз, причем уже очищенным от пробелов; числовым колонкам
+            # хватает float32
+            for c in (store_column, product_column):
+                if c in df.columns:
+                    df[c] = df[c].astype('string').str.strip().astype('category')
+
+            # Векторное приведение числовых колонок — один C-проход на колонку
+            # вместо parse_float на каждую ячейку
+            present_price_columns = [c for c in price_columns if c in df.columns]
+            if quantity_column in df.columns:
+                df[quantity_column] = numeric_column(df[quantity_column]).astype('float32')
+            for c in present_price_columns:
+                df[c] = numeric_column(df[c]).astype('float32')
+
+            # Всю числовую часть горячего пути считаем заранее на колонках:
+            # количество с дефолтом 1 и первая положительная цена по приоритету колонок
+            if quantity_column in df.columns:
+                df['_quantity'] = df[quantity_column].where(df[quantity_column] > 0, 1.0).fillna(1.0)
             else:
-                # Попробуем поиск с нечеткими совпадениями
-                for stored_name, id in store_dict.items():
-                    if store_name in stored_name or stored_name in store_name:
-                        store_id = id
-                        # Добавляем в словарь для будущих запросов
-                        store_dict[store_name] = id
-                        break
-            
-            if not store_id:
-                if store_name not in missing_stores:
-                    missing_stores.add(store_name)
-                    logger.warning(f"Магазин не найден: {store_name}")
-                continue
-            
-            # Находим ID товара с более гибким поиском
-            product_id = None
-            if item_name in product_dict:
-                product_id, _ = product_dict[item_name]
+                df['_quantity'] = 1.0
+            if present_price_columns:
+                price_frame = df[present_price_columns]
+                df['_price'] = price_frame.where(price_frame > 0).bfill(axis=1).iloc[:, 0]
             else:
-                # Попробуем более гибкий поиск
-                for product_name, (pid, _) in product_dict.items():
-                    if item_name in product_name or product_name in item_name:
-                        product_id = pid
-                        # Добавляем в словарь для будущих запросов
-                        product_dict[item_name] = (pid, 0)
-                        break
-            
-            if not product_id:
-                if item_name not in missing_products:
-                    missing_products.add(item_name)
-                    logger.warning(f"Товар не найден: {item_name}")
-                continue
-            
-            # Получаем дату
-            date_str = row.get(date_column)
-            if pd.isna(date_str):
-                date = datetime.now()
+                df['_price'] = float('nan')
+
+            # Дата одним вызовом pd.to_datetime: format= включает быстрый
+            # C-путь, остаток дообрабатывается автоопределением, NaT
+            # заполняется текущим временем — как в прежней построчной ветке
+            if date_column in df.columns:
+                dates = pd.to_datetime(df[date_column], format='%Y-%m-%d', errors='coerce')
+                unresolved = dates.isna() & df[date_column].notna()
+                if unresolved.any():
+                    dates.loc[unresolved] = pd.to_datetime(
+                        df.loc[unresolved, date_column], errors='coerce')
+                dates = dates.fillna(pd.Timestamp.now())
             else:
-                try:
-                    if isinstance(date_str, str):
-                        date = datetime.strptime(date_str, '%Y-%m-%d')
-                    else:
-                        date = pd.to_datetime(date_str)
-                except Exception as e:
-                    logger.debug(f"Ошибка при преобразовании даты '{date_str}': {str(e)}")
-                    date = datetime.now()
-            
-            # Получаем количество с дефолтным значением 1
-            quantity = parse_float(row.get(quantity_column), default=1)
-            if quantity <= 0:
-                quantity = 1
-            
-            # Получаем цену, сначала из файла, затем из базы
-            price = None
-            for price_col in price_columns:
-                if price_col in df.columns:
-                    price_val = parse_float(row.get(price_col))
-                    if price_val and price_val > 0:
-                        price = price_val
-                        break
-            
-            # Если не нашли цену в файле, берем из базы данных
-            if not price or price <= 0:
-                product = Product.query.get(product_id)
-                if product and product.price > 0:
-                    price = product.price
-                else:
-                    # Используем среднюю цену или фиксированное значение
-                    avg_price = db.session.query(db.func.avg(Product.price)).filter(Product.price > 0).scalar()
-                    price = avg_price if avg_price and avg_price > 0 else 1000
-                    logger.debug(f"Для товара {item_name} используется средняя цена {price}")
-            
-            # Создаем новую продажу
-            sale = Sale(
-                product_id=product_id,
-                store_id=store_id,
-                quantity=quantity,
-                price=price,
-                date=date
-            )
-            sales_batch.append(sale)
-            sales_counter += 1
-            
-            # Периодически сохраняем пакеты продаж
-            if len(sales_batch) >= batch_size:
-                db.session.bulk_save_objects(sales_batch)
-                db.session.commit()
-                logger.info(f"Сохранено {sales_counter} продаж")
-                sales_batch = []
-        
-        # Сохраняем оставшиеся продажи
-        if sales_batch:
-            db.session.bulk_save_objects(sales_batch)
-            db.session.commit()
-            logger.info(f"Сохранено итоговых {sales_counter} продаж")
+                dates = pd.Series(pd.Timestamp.now(), index=df.index)
+
+            # Разрешаем имена в id один раз на уникальное значение категории,
+            # а не на строку файла: миллионы строк против тысяч уникальных имен.
+            # Результат — NumPy-массивы id, индексируемые кодами категорий
+            def ids_by_category_codes(column, resolve):
+                """Строит массив id на всю колонку по кодам category-dtype.
+
+                resolve(name) -> id или None; вызывается по разу на уникальное имя.
+                Последний элемент таблицы (-1) ловит NaN (код -1 у pandas).
+                """
+                if column not in df.columns:
+                    return np.full(len(df), -1, dtype=np.int64)
+                cats = df[column].cat.categories
+                id_by_code = np.full(len(cats) + 1, -1, dtype=np.int64)
+                for code, name in enumerate(cats):
+                    if not name:
+                        continue
+                    resolved = resolve(name)
+                    if resolved is not None:
+                        id_by_code[code] = resolved
+                return id_by_code[df[column].cat.codes.to_numpy()]
+
+            def fuzzy_match(name, known_names):
+                """Возвращает ближайшее известное имя или None.
+
+                С RapidFuzz — SIMD-сравнение со score_cutoff; без него —
+                прежний поиск по вхождению подстроки.
+                """
+                if rapidfuzz_available:
+                    match = rf_process.extractOne(
+                        name, known_names, scorer=fuzz.partial_ratio, score_cutoff=85)
+                    return match[0] if match else None
+                for known_name in known_names:
+                    if name in known_name or known_name in name:
+                        return known_name
+                return None
+
+            def resolve_store(store_name):
+                if store_name in store_dict:
+                    return store_dict[store_name]
+                # Нечеткий поиск — один раз на уникальное имя
+                matched = fuzzy_match(store_name, list(store_dict.keys()))
+                if matched is not None:
+                    store_aliases[store_name] = matched
+                    store_dict[store_name] = store_dict[matched]
+                    return store_dict[store_name]
+                # Без предупреждения на каждое имя: весь набор ненайденных
+                # магазинов выводится одной строкой в конце импорта
+                missing_stores.add(store_name)
+                return None
+
+            def resolve_product(item_name):
+                if item_name in product_dict:
+                    return product_dict[item_name][0]
+                matched = fuzzy_match(item_name, list(product_dict.keys()))
+                if matched is not None:
+                    product_aliases[item_name] = matched
+                    pid = product_dict[matched][0]
+                    product_dict[item_name] = (pid, 0)
+                    return pid
+                missing_products.add(item_name)
+                return None
+
+            def batch_fuzzy_resolve(column, known_names):
+                """Сопоставляет все неизвестные имена колонки одним вызовом cdist.
+
+                RapidFuzz считает матрицу сходства на всех ядрах (workers=-1),
+                GIL при этом отпускается. Возвращает словарь псевдоним ->
+                каноническое имя; без RapidFuzz возвращает пустой словарь, и
+                имена разрешаются поштучно как раньше.
+                """
+                if not rapidfuzz_available or column not in df.columns:
+                    return {}
+                unresolved = [n for n in df[column].cat.categories
+                              if n and n not in known_names]
+                if not unresolved or not known_names:
+                    return {}
+                choices = list(known_names)
+                scores = rf_process.cdist(unresolved, choices,
+                                          scorer=fuzz.partial_ratio,
+                                          score_cutoff=85, workers=-1)
+                best = scores.argmax(axis=1)
+                return {name: choices[best[i]]
+                        for i, name in enumerate(unresolved)
+                        if scores[i, best[i]] > 0}
+
+            # Пакетное нечеткое сопоставление до построчного разрешения —
+            # резолверам остаются только готовые словарные попадания
+            for alias, canonical in batch_fuzzy_resolve(store_column, store_dict.keys()).items():
+                store_aliases[alias] = canonical
+                store_dict[alias] = store_dict[canonical]
+            for alias, canonical in batch_fuzzy_resolve(product_column, product_dict.keys()).items():
+                product_aliases[alias] = canonical
+                product_dict[alias] = (product_dict[canonical][0], 0)
+
+            store_ids = ids_by_category_codes(store_column, resolve_store)
+            product_ids = ids_by_category_codes(product_column, resolve_product)
+
+            # Цена из базы тем же приемом: по разу на уникальное имя товара,
+            # дальше NumPy-индексация — в цикле не остается ни одной
+            # скалярной очистки строк. Ищем по разрешенному id (product_dict
+            # к этому моменту содержит и псевдонимы), а не по имени — строка
+            # с нечетко сопоставленным именем получает цену канонического
+            # товара, а не среднюю по базе
+            if product_column in df.columns:
+                cats = df[product_column].cat.categories
+                price_by_code = np.zeros(len(cats) + 1, dtype=np.float64)
+                for code, name in enumerate(cats):
+                    if not name or name not in product_dict:
+                        continue
+                    db_price = price_by_id.get(product_dict[name][0])
+                    if db_price and db_price > 0:
+                        price_by_code[code] = db_price
+                db_prices = price_by_code[df[product_column].cat.codes.to_numpy()]
+            else:
+                db_prices = np.zeros(len(df), dtype=np.float64)
+
+            # Финальная цена целиком векторно: цена из файла, иначе цена
+            # из базы, иначе средняя по товарам (агрегат выполняется один
+            # раз и только если он вообще нужен)
+            file_prices = np.nan_to_num(df['_price'].to_numpy(np.float64), nan=0.0)
+            final_prices = np.where(file_prices > 0, file_prices, db_prices)
+            missing_price = final_prices <= 0
+            if missing_price.any():
+                if avg_price is None:
+                    avg_value = db.session.query(db.func.avg(Product.price)).filter(Product.price > 0).scalar()
+                    avg_price = avg_value if avg_value and avg_value > 0 else 1000
+                logger.debug("Для %d строк используется средняя цена %s",
+                             int(missing_price.sum()), avg_price)
+                final_prices = np.where(missing_price, avg_price, final_prices)
+
+            # Вместо iterrows (Series на каждую строку) идем zip-ом по колонкам.
+            # Строки без разрешенного магазина/товара отсекаются одной
+            # булевой маской — в цикл они вообще не попадают
+            valid_mask = (store_ids >= 0) & (product_ids >= 0)
+
+            frame_store_ids = store_ids[valid_mask]
+            frame_product_ids = product_ids[valid_mask]
+            frame_prices = final_prices[valid_mask]
+            frame_dates = dates[valid_mask].dt.to_pydatetime()
+            frame_quantities = df['_quantity'][valid_mask].to_numpy()
+            valid_total = len(frame_store_ids)
+
+            # Готовые массивы режем срезами сразу на пакеты: ни append,
+            # ни len() на каждую строку, ни словарей — колонки уходят в
+            # save_sales_batch как есть (COPY на PostgreSQL)
+            for start in range(0, valid_total, batch_size):
+                chunk = slice(start, start + batch_size)
+                sales_counter += save_sales_batch(
+                    frame_product_ids[chunk],
+                    frame_store_ids[chunk],
+                    frame_quantities[chunk],
+                    frame_prices[chunk],
+                    frame_dates[chunk],
+                )
+                logger.debug("Сохранено %d/%d продаж порции, всего %d",
+                             min(start + batch_size, valid_total), valid_total, sales_counter)
+
+        # Autoflush выключен на весь проход: запросы внутри цикла не должны
+        # сбрасывать накопленный пакет в БД раньше времени
+        with bulk_session():
+            for frame_no, df in enumerate(iter_sales_frames(), start=1):
+                logger.info("Обработка порции %d: %d строк", frame_no, len(df))
+                process_sales_frame(df)
+                del df
+
+        # Запоминаем найденные нечеткие соответствия для следующего импорта
+        if store_aliases or product_aliases:
+            try:
+                with open(alias_cache_path, 'wb') as f:
+                    pickle.dump({'key': cache_key,
+                                 'stores': store_aliases,
+                                 'products': product_aliases}, f)
+            except OSError as e:
+                logger.debug(f"Не удалось сохранить кэш соответствий: {str(e)}")
         
         elapsed_time = time.time() - start_time
         logger.info(f"Успешно импортированы данные о продажах. Создано {sales_counter} записей о продажах за {elapsed_time:.2f} секунд")
         
         if missing_stores:
-            logger.warning(f"Не найдено {len(missing_stores)} магазинов: {', '.join(list(missing_stores)[:5])}...")
+            logger.warning("Не найдено %d магазинов: %s...",
+                           len(missing_stores), ', '.join(list(missing_stores)[:5]))
         
         if missing_products:
-            logger.warning(f"Не найдено {len(missing_products)} товаров: {', '.join(list(missing_products)[:5])}...")
+            logger.warning("Не найдено %d товаров: %s...",
+                           len(missing_products), ', '.join(list(missing_products)[:5]))
         
         # Обновляем цены товаров на основе импортированных продаж
         if sales_counter > 0:
@@ -832,10 +1208,11 @@ def import_sales(file_path):
                 ).update({
                     Product.price: price_subquery.c.avg_price
                 }, synchronize_session=False)
-                
-                db.session.commit()
                 logger.info(f"Обновлены цены для {update_count} товаров")
-        
+
+        # Единственный COMMIT на весь импорт продаж
+        db.session.commit()
+
         return sales_counter
         
     except Exception as e:
@@ -856,73 +1233,81 @@ def update_zero_prices(sales_path):
             logger.error(f"Файл не найден: {sales_path}")
             return
         
-        # Читаем Excel файл и находим нужные колонки
+        # Определяем нужные колонки по небольшой выборке, затем читаем
+        # файл целиком только с ними — как в import_sales
         logger.info(f"Чтение файла {sales_path}...")
-        df = pd.read_excel(sales_path)
-        logger.info(f"Прочитано {len(df)} строк из файла")
-        logger.info(f"Колонки в файле: {df.columns.tolist()}")
-        
-        # Определяем колонки для работы
-        price_columns = find_price_columns(df)
-        product_column = find_product_column(df)
+        sample = read_excel_fast(sales_path, nrows=50)
+        logger.info(f"Колонки в файле: {sample.columns.tolist()}")
+
+        price_columns = find_price_columns(sample)
+        product_column = find_product_column(sample)
+
+        wanted_columns = {product_column, *price_columns}
+        pq_path = _ensure_parquet_cache(sales_path)
+
+        def iter_price_frames():
+            """Отдает файл порциями — пиковая память не зависит от его размера"""
+            if pq_path is not None:
+                parquet_file = pa_parquet.ParquetFile(pq_path)
+                batch_columns = [c for c in parquet_file.schema_arrow.names if c in wanted_columns]
+                for batch in parquet_file.iter_batches(batch_size=100000, columns=batch_columns):
+                    yield batch.to_pandas()
+                return
+            yield read_excel_fast(sales_path, usecols=lambda c: c in wanted_columns)
         
         # Получаем товары с нулевой ценой
-        zero_price_products = {p.name: p.id for p in Product.query.filter(Product.price == 0).all()}
+        zero_price_products = {
+            name: product_id
+            for name, product_id in db.session.query(Product.name, Product.id)
+                                              .filter(Product.price == 0)
+        }
         logger.info(f"Найдено {len(zero_price_products)} товаров с нулевой ценой")
         
         if not zero_price_products:
             logger.info("Нет товаров с нулевой ценой для обновления")
             return
         
-        # Словарь для накопления цен товаров
-        product_prices = {}  # {product_id: [цена1, цена2, ...]}
-        
-        # Собираем цены из файла
-        for idx, row in df.iterrows():
-            if idx > 0 and idx % 10000 == 0:
-                logger.info(f"Обработано {idx}/{len(df)} строк")
-            
-            item_name = clean_string(handle_null(row.get(product_column)))
-            
-            if not item_name or item_name not in zero_price_products:
-                continue
-            
-            product_id = zero_price_products[item_name]
-            
-            # Ищем цену в различных колонках
-            price = None
-            for price_col in price_columns:
-                price_val = parse_float(row.get(price_col))
-                if price_val and price_val > 0:
-                    price = price_val
-                    break
-            
-            # Если нашли цену, добавляем в словарь
-            if price and price > 0:
-                if product_id not in product_prices:
-                    product_prices[product_id] = []
-                product_prices[product_id].append(price)
-        
-        # Обновляем цены товаров
-        logger.info(f"Обновление цен для {len(product_prices)} товаров...")
-        for product_id, prices in product_prices.items():
-            # Используем среднюю цену
-            avg_price = sum(prices) / len(prices)
-            
-            product = Product.query.get(product_id)
-            if product and product.price == 0:
-                product.price = avg_price
-                db.session.add(product)
-                price_updated += 1
-                
-                if price_updated % 1000 == 0:
-                    db.session.commit()
-                    logger.info(f"Обновлено {price_updated} цен товаров")
-        
-        # Сохраняем оставшиеся изменения
-        if price_updated % 1000 != 0:
-            db.session.commit()
-            logger.info(f"Обновлено {price_updated} цен товаров")
+        # Сумма и число цен по товару накапливаются по порциям файла,
+        # средняя считается один раз в конце
+        price_sums = pd.Series(dtype='float64')
+        price_counts = pd.Series(dtype='float64')
+        for df in iter_price_frames():
+            # Векторная очистка: имена и цены приводятся колонками, а не по ячейке
+            item_names = clean_text_column(df[product_column])
+            price_frame = pd.concat(
+                [numeric_column(df[c]) for c in price_columns if c in df.columns],
+                axis=1
+            ) if price_columns else pd.DataFrame(index=df.index)
+            # Первая положительная цена по приоритету колонок
+            first_price = price_frame.where(price_frame > 0).bfill(axis=1).iloc[:, 0] \
+                if len(price_frame.columns) else pd.Series(float('nan'), index=df.index)
+
+            # Групповые суммы по порции вместо словаря списков в цикле
+            prices = pd.DataFrame({'name': item_names, 'price': first_price})
+            prices = prices[(prices['name'] != '')
+                            & prices['price'].gt(0)
+                            & prices['name'].isin(zero_price_products)]
+            grouped = prices.groupby('name')['price']
+            price_sums = price_sums.add(grouped.sum(), fill_value=0)
+            price_counts = price_counts.add(grouped.count(), fill_value=0)
+            del df, prices, price_frame
+
+        avg_by_name = price_sums / price_counts
+
+        # Один пакетный UPDATE (executemany) вместо запроса на каждый товар
+        logger.info(f"Обновление цен для {len(avg_by_name)} товаров...")
+        update_rows = [
+            {'p_id': zero_price_products[name], 'p_price': float(price)}
+            for name, price in avg_by_name.items()
+        ]
+        if update_rows:
+            products = Product.__table__
+            stmt = (products.update()
+                    .where(products.c.id == db.bindparam('p_id'))
+                    .where(products.c.price == 0)
+                    .values(price=db.bindparam('p_price')))
+            db.session.execute(stmt, update_rows)
+            price_updated = len(update_rows)
         
         # Проверяем, сколько товаров осталось с нулевыми ценами
         remaining_zero = db.session.query(db.func.count(Product.id)).filter(Product.price == 0).scalar()
@@ -936,11 +1321,13 @@ def update_zero_prices(sales_path):
             
             # Применим эту цену к оставшимся товарам
             db.session.query(Product).filter(Product.price == 0).update({Product.price: avg_price})
-            db.session.commit()
-            
+
             logger.info(f"Для оставшихся {remaining_zero} товаров установлена средняя цена: {avg_price:.2f}")
             price_updated += remaining_zero
-        
+
+        # Единственный COMMIT на все обновление цен
+        db.session.commit()
+
         elapsed_time = time.time() - start_time
         logger.info(f"Успешно обновлены цены {price_updated} товаров за {elapsed_time:.2f} секунд")
         
@@ -988,8 +1375,19 @@ def import_only_prices_and_sales():
         # Если есть продажи, удаляем их перед новым импортом
         if sales_count > 0:
             logger.info(f"Удаление существующих {sales_count} записей о продажах...")
-            db.session.query(Sale).delete()
-            db.session.commit()
+            # Без отдельного COMMIT: удаление и новый импорт идут одной
+            # транзакцией — ее закроет финальный COMMIT в import_sales,
+            # и при ошибке импорта старые продажи останутся на месте.
+            # На PostgreSQL TRUNCATE чистит таблицу на уровне метаданных
+            # (и тоже откатывается), остальным диалектам — обычный DELETE.
+            # ВАЖНО: TRUNCATE держит ACCESS EXCLUSIVE до конца транзакции,
+            # поэтому вся дальнейшая запись в sales (включая COPY в
+            # copy_into_table) обязана идти по соединению этой же сессии —
+            # запись с любого другого соединения повиснет на блокировке
+            if db.session.get_bind().dialect.name == 'postgresql':
+                db.session.execute(db.text('TRUNCATE TABLE sales RESTART IDENTITY'))
+            else:
+                db.session.query(Sale).delete()
         
         # Импортируем продажи
         import_sales(sales_path)
@@ -3,9 +3,9 @@
 Не требует scikit-learn или statsmodels.
 """
 import numpy as np
+import pandas as pd
 import math
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 
 def simple_moving_average(data, window=3):
     """
@@ -18,12 +18,16 @@ def simple_moving_average(data, window=3):
     Returns:
         Список сглаженных значений
     """
-    result = []
-    for i in range(len(data)):
-        start_idx = max(0, i - window + 1)
-        window_values = data[start_idx:i+1]
-        result.append(sum(window_values) / len(window_values))
-    return result
+    # Вместо суммирования окна на каждой позиции (O(N*W)) считаем
+    # кумулятивную сумму один раз: сумма окна — разность двух ее элементов
+    arr = np.asarray(data, dtype=np.float64)
+    if arr.size == 0:
+        return []
+    cumsum = np.cumsum(arr)
+    window_sums = cumsum.copy()
+    window_sums[window:] = cumsum[window:] - cumsum[:-window]
+    window_lengths = np.minimum(np.arange(arr.size) + 1, window)
+    return (window_sums / window_lengths).tolist()
 
 def simple_linear_regression(x, y):
     """
@@ -39,20 +43,25 @@ def simple_linear_regression(x, y):
     n = len(x)
     if n != len(y) or n < 2:
         return 0, 0
-        
-    mean_x = sum(x) / n
-    mean_y = sum(y) / n
-    
-    numerator = sum((x[i] - mean_x) * (y[i] - mean_y) for i in range(n))
-    denominator = sum((x[i] - mean_x) ** 2 for i in range(n))
-    
+
+    # Четыре прохода по данным (средние, ковариация, дисперсия) слиты в
+    # накопление моментов: суммы и скалярные произведения считаются BLAS-ом,
+    # а коэффициенты выводятся из них по формулам
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    sum_x = x.sum()
+    sum_y = y.sum()
+    sum_xx = x @ x
+    sum_xy = x @ y
+
+    denominator = n * sum_xx - sum_x * sum_x
     if denominator == 0:
-        return 0, mean_y
-    
-    slope = numerator / denominator
-    intercept = mean_y - slope * mean_x
-    
-    return slope, intercept
+        return 0, sum_y / n
+
+    slope = (n * sum_xy - sum_x * sum_y) / denominator
+    intercept = (sum_y - slope * sum_x) / n
+
+    return float(slope), float(intercept)
 
 def naive_seasonal_forecast(data, periods=6, seasonal_period=7, alpha=0.3):
     """
@@ -67,49 +76,52 @@ def naive_seasonal_forecast(data, periods=6, seasonal_period=7, alpha=0.3):
     Returns:
         Список прогнозных значений
     """
-    if len(data) < max(seasonal_period * 2, 10):
+    # Вход конвертируется в ndarray один раз — все дальнейшие проходы
+    # (сезонные суммы, среднее, хвост сглаживания) идут по нему без
+    # поэлементной распаковки Python-списка
+    arr = np.asarray(data, dtype=np.float64)
+
+    if arr.size < max(seasonal_period * 2, 10):
         # Недостаточно данных для хорошего сезонного прогноза
-        return [data[-1]] * periods
-    
-    # Вычисляем сезонные индексы
-    seasons = {}
-    for i in range(len(data)):
-        season_idx = i % seasonal_period
-        if season_idx not in seasons:
-            seasons[season_idx] = []
-        seasons[season_idx].append(data[i])
-    
-    # Усредняем сезонные индексы
-    seasonal_indices = {}
-    for season, values in seasons.items():
-        seasonal_indices[season] = sum(values) / len(values)
-    
+        return [float(arr[-1])] * periods
+
+    # Вычисляем сезонные индексы. Вместо словаря сезон -> список значений
+    # группируем по остатку от деления двумя bincount: сумма и счетчик
+    # каждого сезона считаются на уровне C без append на элемент
+    season_idx = np.arange(arr.size) % seasonal_period
+    season_sums = np.bincount(season_idx, weights=arr, minlength=seasonal_period)
+    season_counts = np.bincount(season_idx, minlength=seasonal_period)
+    seasonal_means = season_sums / np.maximum(season_counts, 1)
+
     # Нормализуем индексы
-    avg_value = sum(data) / len(data)
-    for season in seasonal_indices:
-        seasonal_indices[season] = seasonal_indices[season] / avg_value if avg_value > 0 else 1.0
-    
-    # Прогнозируем будущие значения
+    avg_value = arr.mean()
+    if avg_value > 0:
+        seasonal_indices = seasonal_means / avg_value
+    else:
+        seasonal_indices = np.ones(seasonal_period)
+
+    # Базовый прогноз (экспоненциальное сглаживание) не зависит от номера
+    # периода: веса и свертку с хвостом ряда считаем один раз до цикла
+    tail_length = min(5, arr.size - 1)
+    weights = alpha * (1 - alpha) ** np.arange(tail_length)
+    base_value = arr[-1] + float(weights @ arr[-2:-2 - tail_length:-1])
+
+    # Прогнозируем будущие значения; шум для всего горизонта берем одним
+    # векторным вызовом вместо random.uniform на каждую итерацию
+    noise = np.random.uniform(0.95, 1.05, periods)
     result = []
     for i in range(periods):
         # Индекс сезона для прогноза
-        season_idx = (len(data) + i) % seasonal_period
-        
-        # Базовый прогноз (используем экспоненциальное сглаживание)
-        base_value = data[-1]
-        for j in range(min(5, len(data)-1)):
-            weight = alpha * (1-alpha)**j
-            base_value += weight * data[-(j+2)]
-        
+        forecast_season = (arr.size + i) % seasonal_period
+
         # Применяем сезонный коэффициент
-        seasonal_factor = seasonal_indices.get(season_idx, 1.0)
-        forecast = base_value * seasonal_factor
-        
+        forecast = base_value * seasonal_indices[forecast_season]
+
         # Добавляем немного случайности
-        forecast *= random.uniform(0.95, 1.05)
-        
+        forecast *= noise[i]
+
         result.append(max(0, forecast))
-    
+
     return result
 
 def generate_simple_prediction(data, periods=6, method='average'):
@@ -170,14 +182,14 @@ def generate_simple_prediction(data, periods=6, method='average'):
         # Базовая уверенность немного выше, так как учитываем сезонность
         confidence_base = 0.7
     
-    # Уменьшаем уверенность по мере удаления в будущее
-    result = []
-    for i, pred in enumerate(predictions):
-        # С каждым шагом в будущее снижаем уверенность на 5%
-        confidence = max(0.5, confidence_base * (1 - 0.05 * i))
-        result.append((max(0, pred), confidence))
-    
-    return result
+    # Уменьшаем уверенность по мере удаления в будущее: на каждом шаге
+    # минус 5%, но не ниже 0.5 — обе ветки считаются одним np.clip
+    # без max() на итерацию; округление остается в format_predictions_for_api
+    values = np.maximum(0, np.asarray(predictions, dtype=np.float64))
+    confidences = np.clip(
+        confidence_base * (1 - 0.05 * np.arange(len(predictions))), 0.5, None)
+
+    return list(zip(values.tolist(), confidences.tolist()))
 
 def generate_date_series(start_date, periods, freq='day'):
     """
@@ -193,27 +205,29 @@ def generate_date_series(start_date, periods, freq='day'):
     """
     if isinstance(start_date, str):
         start_date = datetime.strptime(start_date, '%Y-%m-%d')
-    
-    result = []
-    current_date = start_date
-    
-    for _ in range(periods):
-        if freq == 'day':
-            current_date += timedelta(days=1)
-            result.append(current_date.strftime('%Y-%m-%d'))
-        elif freq == 'week':
-            current_date += timedelta(days=7)
-            result.append(f"{current_date.strftime('%Y')}-W{current_date.isocalendar()[1]:02d}")
-        elif freq == 'month':
-            year = current_date.year + (current_date.month // 12)
-            month = (current_date.month % 12) + 1
-            current_date = current_date.replace(year=year, month=month)
-            result.append(f"{current_date.strftime('%Y-%m')}")
-        elif freq == 'year':
-            current_date = current_date.replace(year=current_date.year + 1)
-            result.append(str(current_date.year))
-    
-    return result
+
+    # Всю серию дат строит pd.date_range одним вызовом вместо timedelta
+    # и strftime на каждый период; DateOffset сохраняет день месяца
+    # при шаге в месяц/год, как и прежний replace()
+    offsets = {
+        'day': pd.DateOffset(days=1),
+        'week': pd.DateOffset(weeks=1),
+        'month': pd.DateOffset(months=1),
+        'year': pd.DateOffset(years=1),
+    }
+    if freq not in offsets:
+        return []
+    offset = offsets[freq]
+    dates = pd.date_range(start_date + offset, periods=periods, freq=offset)
+
+    if freq == 'day':
+        return dates.strftime('%Y-%m-%d').tolist()
+    if freq == 'week':
+        weeks = dates.isocalendar().week
+        return [f"{year}-W{week:02d}" for year, week in zip(dates.strftime('%Y'), weeks)]
+    if freq == 'month':
+        return dates.strftime('%Y-%m').tolist()
+    return dates.strftime('%Y').tolist()
 
 def format_predictions_for_api(historical_data, predictions, freq='day', start_date=None):
     """
@@ -234,22 +248,25 @@ def format_predictions_for_api(historical_data, predictions, freq='day', start_d
     # Генерируем даты
     dates = generate_date_series(start_date, len(predictions), freq)
     
-    # Форматируем результат
-    result = []
-    for i, ((value, confidence), date_str) in enumerate(zip(predictions, dates)):
-        # Вычисляем процент роста относительно предыдущего значения
-        if i == 0:
-            prev_value = historical_data[-1] if historical_data else 0
-        else:
-            prev_value = predictions[i-1][0]
-        
-        growth = ((value - prev_value) / prev_value * 100) if prev_value > 0 else 0
-        
-        result.append({
-            'period': date_str,
-            'value': round(value, 2),
-            'growth': round(growth, 2),
-            'confidence': round(confidence, 2)
-        })
-    
-    return result
+    # Рост и округления считаются массивами: предыдущее значение — это
+    # сдвинутый на один вектор прогнозов, а цикл остается только на
+    # сборку итоговых словарей
+    values = np.array([value for value, _ in predictions], dtype=np.float64)
+    confidences = np.array([confidence for _, confidence in predictions], dtype=np.float64)
+
+    previous = np.empty_like(values)
+    if values.size:
+        previous[0] = historical_data[-1] if historical_data else 0
+        previous[1:] = values[:-1]
+    positive = previous > 0
+    growth = np.where(positive,
+                      (values - previous) / np.where(positive, previous, 1) * 100, 0)
+
+    return [{
+        'period': date_str,
+        'value': value,
+        'growth': growth_value,
+        'confidence': confidence
+    } for date_str, value, growth_value, confidence in zip(
+        dates, values.round(2).tolist(), growth.round(2).tolist(),
+        confidences.round(2).tolist())]
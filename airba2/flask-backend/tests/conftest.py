@@ -1,11 +1,174 @@
+import os
+
 import pytest
-from app import create_app
+from flask import g
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from werkzeug.security import generate_password_hash
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.user import User
+
+
+def _clone_postgres_database(url):
+    """Готовит базу воркера копированием шаблонной (CI на Postgres).
+
+    Схема один раз разворачивается в базу <имя>_template, после чего база
+    каждого воркера создается через CREATE DATABASE ... TEMPLATE — копирование
+    файлов каталога на порядок дешевле, чем create_all/drop_all по DDL.
+    """
+    base = make_url(url)
+    worker = os.getenv('PYTEST_XDIST_WORKER', 'master')
+    template = f'{base.database}_template'
+    worker_db = f'{base.database}_{worker}'
+
+    maintenance = create_engine(
+        base.set(database='postgres'), isolation_level='AUTOCOMMIT')
+    with maintenance.connect() as conn:
+        # Advisory lock, чтобы воркеры не создавали шаблон наперегонки
+        conn.execute(text('SELECT pg_advisory_lock(9235)'))
+        try:
+            exists = conn.execute(
+                text('SELECT 1 FROM pg_database WHERE datname = :name'),
+                {'name': template}).scalar()
+            if not exists:
+                conn.execute(text(f'CREATE DATABASE "{template}"'))
+                schema_engine = create_engine(base.set(database=template))
+                db.metadata.create_all(schema_engine)
+                schema_engine.dispose()
+        finally:
+            conn.execute(text('SELECT pg_advisory_unlock(9235)'))
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{worker_db}"'))
+        conn.execute(
+            text(f'CREATE DATABASE "{worker_db}" TEMPLATE "{template}"'))
+    maintenance.dispose()
+    return str(base.set(database=worker_db))
+
+
+@pytest.fixture(scope='session')
+def db_path(tmp_path_factory):
+    """Файл базы в приватном temp-каталоге сессии: под xdist
+    tmp_path_factory сам разводит воркеров по разным каталогам,
+    так что случайно разделить базу между воркерами невозможно"""
+    return tmp_path_factory.mktemp('db') / 'test.sqlite'
+
+
+@pytest.fixture(scope='session')
+def app(db_path):
+    """Приложение с конфигом 'testing': схема создается один раз на сессию"""
+    if TestingConfig.SQLALCHEMY_DATABASE_URI.startswith('postgresql'):
+        TestingConfig.SQLALCHEMY_DATABASE_URI = _clone_postgres_database(
+            TestingConfig.SQLALCHEMY_DATABASE_URI)
+    else:
+        TestingConfig.SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+
+    app = create_app('testing')
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            # Вторая половина обхода pysqlite (см. TestingConfig): транзакции
+            # начинаются явным BEGIN, чтобы SAVEPOINT-ы работали корректно
+            @event.listens_for(db.engine, 'begin')
+            def _sqlite_begin(conn):
+                conn.exec_driver_sql('BEGIN')
+
+        db.create_all()
+        # Кеш скомпилированных запросов должен быть включен — иначе каждый
+        # запрос компилирует SQL заново (см. query_cache_size в TestingConfig)
+        assert db.engine._compiled_cache is not None
+        yield app
+        db.drop_all()
+
+@pytest.fixture(scope='session', autouse=True)
+def _assert_indexes(app):
+    """Страховка от регрессии: поиск пользователя по имени должен идти
+    по индексу, а не полным сканом таблицы"""
+    from sqlalchemy import inspect
+    indexes = inspect(db.engine).get_indexes('users')
+    assert any(index['name'] == 'ix_users_username' for index in indexes)
+
+@pytest.fixture(scope='session', autouse=True)
+def _warmup(app):
+    """Прогрев перед первым тестом: конфигурация мапперов ORM, сборка
+    роутинга werkzeug и первая компиляция запроса оплачиваются один раз
+    здесь, а не внутри первого замеряемого теста"""
+    from sqlalchemy.orm import configure_mappers
+    configure_mappers()
+    with app.test_client() as warm_client:
+        warm_client.get('/api/users/__warmup__')
+    # Запрос шел внутри app_context сессионной фикстуры, поэтому teardown
+    # Flask-SQLAlchemy не сработал — закрываем транзакцию прогрева вручную
+    db.session.remove()
+
+@pytest.fixture(scope='module')
+def _client(app):
+    """Один test_client на модуль: сам клиент не хранит состояния между
+    запросами, пересоздавать его на каждый тест не нужно"""
+    with app.test_client() as test_client:
+        yield test_client
 
 @pytest.fixture
-def app():
-    app = create_app()
-    yield app
+def db_rollback(app):
+    """Изоляция теста через SAVEPOINT.
+
+    Вместо create_all/drop_all на каждый тест сессия привязывается к
+    соединению с открытой внешней транзакцией; COMMIT внутри теста
+    закрывает только SAVEPOINT, а откат внешней транзакции в teardown
+    возвращает базу к чистому состоянию.
+    """
+    # app_context в тестах один на всю сессию, поэтому flask.g переживает
+    # запросы — сбрасываем кеш, который в проде живет ровно один запрос
+    g.pop('_user_cache', None)
+
+    engine = db.engine
+    connection = engine.connect()
+    transaction = connection.begin()
+
+    # Session.get_bind у Flask-SQLAlchemy выбирает движок через db.engines,
+    # поэтому подменяем сам движок соединением с открытой транзакцией
+    db.engines[None] = connection
+    original_session = db.session
+    db.session = db._make_scoped_session(
+        {'join_transaction_mode': 'create_savepoint'})
+    try:
+        yield
+    finally:
+        db.session.remove()
+        db.session = original_session
+        db.engines[None] = engine
+        transaction.rollback()
+        connection.close()
+
+@pytest.fixture
+def client(_client, db_rollback):
+    """Тестовый клиент с изоляцией БД (см. db_rollback)"""
+    return _client
+
+@pytest.fixture
+def query_counter(app):
+    """Собирает SELECT-ы, ушедшие в БД. Должен стоять в сигнатуре теста
+    ПЕРЕД client: соединение копирует слушателей движка при создании,
+    поэтому счетчик обязан подключиться до открытия соединения теста"""
+    selects = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            selects.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', _count)
+    try:
+        yield selects
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _count)
 
 @pytest.fixture
-def client(app):
-    return app.test_client()
\ No newline at end of file
+def seeded_user(app, db_rollback):
+    """Пользователь, вставленный напрямую через ORM: дешевле, чем
+    повторять POST /api/users в тестах, которым нужна готовая запись"""
+    user = User(
+        username='testuser',
+        password_hash=generate_password_hash(
+            'password123', method=app.config['PASSWORD_HASH_METHOD']),
+    )
+    db.session.add(user)
+    db.session.commit()
+    return user
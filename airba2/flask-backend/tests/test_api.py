@@ -1,37 +1,35 @@
+import json
+
 import pytest
-from app import create_app, db
-from app.models.user import User
 
-@pytest.fixture
-def client():
-    app = create_app('testing')
-    with app.test_client() as client:
-        with app.app_context():
-            db.create_all()
-        yield client
-        with app.app_context():
-            db.drop_all()
+# Тело запроса сериализуется один раз при импорте модуля: client.post(json=...)
+# гонял бы json.dumps на каждый вызов
+_USER_BODY = json.dumps({
+    'username': 'testuser',
+    'email': 'testuser@example.com',
+    'password': 'password123'
+}).encode()
 
 def test_create_user(client):
-    response = client.post('/api/users', json={
-        'username': 'testuser',
-        'email': 'testuser@example.com',
-        'password': 'password123'
-    })
+    response = client.post('/api/users', data=_USER_BODY,
+                           content_type='application/json')
     assert response.status_code == 201
     assert response.json['username'] == 'testuser'
 
-def test_get_user(client):
-    client.post('/api/users', json={
-        'username': 'testuser',
-        'email': 'testuser@example.com',
-        'password': 'password123'
-    })
+@pytest.mark.parametrize('username, status, field, value', [
+    ('testuser', 200, 'username', 'testuser'),
+    ('nonexistent', 404, 'message', 'User not found'),
+])
+def test_get_user(client, request, username, status, field, value):
+    if username == 'testuser':
+        request.getfixturevalue('seeded_user')
+    response = client.get(f'/api/users/{username}')
+    assert response.status_code == status
+    assert response.json[field] == value
+
+def test_get_user_single_query(query_counter, client, seeded_user):
+    """Поиск по имени внутри запроса мемоизируется в flask.g —
+    на один GET должен уходить ровно один SELECT"""
     response = client.get('/api/users/testuser')
     assert response.status_code == 200
-    assert response.json['username'] == 'testuser'
-
-def test_user_not_found(client):
-    response = client.get('/api/users/nonexistent')
-    assert response.status_code == 404
-    assert response.json['message'] == 'User not found'
\ No newline at end of file
+    assert len(query_counter) == 1
\ No newline at end of file